@@ -73,6 +73,7 @@ class I2PStreamingResponse(requests.Response):
         self._stream_started = False
         self._chunk_iterator = None
         self._raw = None  # Store raw stream reference
+        self._read_leftover = b""  # Tail of a chunk partially consumed by read(size)
     
     def _get_reason(self, status_code: int) -> str:
         """Get HTTP reason phrase from status code"""
@@ -159,30 +160,46 @@ class I2PStreamingResponse(requests.Response):
             bytes: Read content
         """
         if size == -1:
-            # Read all remaining content
-            return b"".join(self.iter_content())
+            # Read all remaining content, starting with any tail left
+            # over from a previous sized read
+            content = self._read_leftover + b"".join(self.iter_content())
+            self._read_leftover = b""
+            return content
         else:
-            # Read up to size bytes
+            # Read up to size bytes, serving leftover bytes first
             chunks = []
             remaining = size
-            for chunk in self.iter_content(chunk_size=min(8192, remaining)):
-                if len(chunk) <= remaining:
-                    chunks.append(chunk)
-                    remaining -= len(chunk)
-                    if remaining == 0:
+            if self._read_leftover:
+                chunks.append(self._read_leftover[:remaining])
+                self._read_leftover = self._read_leftover[remaining:]
+                remaining -= len(chunks[0])
+            if remaining > 0:
+                for chunk in self.iter_content(chunk_size=min(8192, remaining)):
+                    if len(chunk) <= remaining:
+                        chunks.append(chunk)
+                        remaining -= len(chunk)
+                        if remaining == 0:
+                            break
+                    else:
+                        # Keep the unconsumed tail for the next read call
+                        # instead of dropping it
+                        chunks.append(chunk[:remaining])
+                        self._read_leftover = chunk[remaining:]
                         break
-                else:
-                    chunks.append(chunk[:remaining])
-                    break
             return b"".join(chunks)
 
 
 class I2PProxy:
     """Wrapper around the Rust I2P proxy daemon for Python"""
     
-    def __init__(self):
-        """Initialize the I2P proxy daemon"""
-        self._daemon = I2PProxyDaemon()
+    def __init__(self, daemon=None):
+        """Initialize the I2P proxy daemon.
+
+        Pass an existing ``I2PProxyDaemon`` as ``daemon`` to share its
+        connections and tunnel state across several proxy instances;
+        otherwise a dedicated daemon is created.
+        """
+        self._daemon = daemon if daemon is not None else I2PProxyDaemon()
     
     def _make_request(
         self,
@@ -1,10 +1,74 @@
 """Test IP address before and after going through proxy"""
+import functools
+import logging
+import os
 import sys
-import json
+import socket
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from i2p_proxy import I2PProxy
 from i2ptunnel import I2PProxyDaemon
 
+try:
+    # orjson parses bytes directly in C, ~4x faster than stdlib json
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+logger = logging.getLogger(__name__)
+if os.environ.get("DEBUG"):
+    logging.basicConfig(level=logging.DEBUG)
+
+
+# Shared session so repeated checks reuse keep-alive connections instead
+# of paying a fresh TCP + TLS handshake per call
+_SESSION = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=16)
+_SESSION.mount('https://', _adapter)
+_SESSION.mount('http://', _adapter)
+
+# Tiny TTL cache in front of getaddrinfo - the same three IP-check hosts
+# get resolved over and over when test_all_proxies loops over proxies
+_DNS_TTL = 300
+_dns_cache = {}
+_real_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(host, *args, **kwargs):
+    key = (host, args, tuple(sorted(kwargs.items())))
+    cached = _dns_cache.get(key)
+    now = time.monotonic()
+    if cached and now - cached[0] < _DNS_TTL:
+        return cached[1]
+    result = _real_getaddrinfo(host, *args, **kwargs)
+    _dns_cache[key] = (now, result)
+    return result
+
+
+socket.getaddrinfo = _cached_getaddrinfo
+
+# One daemon shared by every helper - constructing a fresh
+# I2PProxyDaemon per call re-runs proxy discovery each time
+_DAEMON = None
+
+
+def _get_daemon():
+    global _DAEMON
+    if _DAEMON is None:
+        _DAEMON = I2PProxyDaemon()
+    return _DAEMON
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_fetch_proxies(ttl_bucket):
+    return _get_daemon().fetch_proxies()
+
+
+def fetch_proxies_cached(ttl=60):
+    """fetch_proxies with a TTL so hot loops skip repeated discovery"""
+    return _cached_fetch_proxies(int(time.time() // ttl))
+
 
 def get_ip_without_proxy():
     """Get IP address without using any proxy (direct connection)"""
@@ -17,28 +81,39 @@ def get_ip_without_proxy():
             "https://ifconfig.me/all.json",
         ]
         
-        for service in services:
-            try:
-                response = requests.get(service, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'ip' in data:
-                        ip = data['ip']
-                    elif 'query' in data:
-                        ip = data['query']
-                    else:
-                        ip = list(data.values())[0] if data else None
-                    
-                    if ip:
-                        print(f"   ✓ Direct IP: {ip}")
-                        print(f"   Service: {service}")
-                        return ip
-            except Exception as e:
-                continue
+        def fetch_ip(service):
+            response = _SESSION.get(service, timeout=10)
+            if response.status_code == 200:
+                data = _json_loads(response.content)
+                if 'ip' in data:
+                    return data['ip']
+                elif 'query' in data:
+                    return data['query']
+                return list(data.values())[0] if data else None
+            return None
+
+        # Query all services concurrently and take the first valid answer;
+        # worst-case wait is one timeout, not the sum of all three. No
+        # `with` block here: its shutdown(wait=True) would join the slow
+        # stragglers and eat the head start the winner just bought us
+        executor = ThreadPoolExecutor(max_workers=len(services))
+        try:
+            futures = {executor.submit(fetch_ip, service): service for service in services}
+            for future in as_completed(futures):
+                try:
+                    ip = future.result()
+                except Exception:
+                    continue
+                if ip:
+                    print(f"   ✓ Direct IP: {ip}")
+                    print(f"   Service: {futures[future]}")
+                    return ip
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         
         # Fallback: try simple text response
         try:
-            response = requests.get("https://api.ipify.org", timeout=10)
+            response = _SESSION.get("https://api.ipify.org", timeout=10)
             if response.status_code == 200:
                 ip = response.text.strip()
                 print(f"   ✓ Direct IP: {ip}")
@@ -68,25 +143,34 @@ def get_ip_with_proxy(proxy_instance=None):
             "https://ifconfig.me/all.json",
         ]
         
-        for service in services:
-            try:
-                response = proxy_instance.get(service)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'ip' in data:
-                        ip = data['ip']
-                    elif 'query' in data:
-                        ip = data['query']
-                    else:
-                        ip = list(data.values())[0] if data else None
-                    
-                    if ip:
-                        print(f"   ✓ Proxy IP: {ip}")
-                        print(f"   Service: {service}")
-                        return ip
-            except Exception as e:
-                print(f"   Service {service} failed: {e}")
-                continue
+        def fetch_ip(service):
+            response = proxy_instance.get(service)
+            if response.status_code == 200:
+                data = _json_loads(response.content)
+                if 'ip' in data:
+                    return data['ip']
+                elif 'query' in data:
+                    return data['query']
+                return list(data.values())[0] if data else None
+            return None
+
+        # Same first-wins fan-out as the direct check, and the same
+        # non-waiting shutdown so the early return actually is early
+        executor = ThreadPoolExecutor(max_workers=len(services))
+        try:
+            futures = {executor.submit(fetch_ip, service): service for service in services}
+            for future in as_completed(futures):
+                try:
+                    ip = future.result()
+                except Exception as e:
+                    print(f"   Service {futures[future]} failed: {e}")
+                    continue
+                if ip:
+                    print(f"   ✓ Proxy IP: {ip}")
+                    print(f"   Service: {futures[future]}")
+                    return ip
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         
         # Fallback: try simple text response
         try:
@@ -108,8 +192,8 @@ def get_ip_with_proxy(proxy_instance=None):
 def get_ip_with_specific_proxy(proxy_url):
     """Get IP address through a specific proxy"""
     print(f"\n[*] Checking IP address through specific proxy: {proxy_url}")
-    
-    daemon = I2PProxyDaemon()
+
+    daemon = _get_daemon()
     
     try:
         # Try multiple IP checking services
@@ -132,9 +216,9 @@ def get_ip_with_specific_proxy(proxy_url):
                     # Parse JSON response
                     body_bytes = response["body"]
                     if isinstance(body_bytes, bytes):
-                        data = json.loads(body_bytes.decode('utf-8'))
+                        data = _json_loads(body_bytes)
                     else:
-                        data = json.loads(str(body_bytes))
+                        data = _json_loads(bytes(body_bytes))
                     
                     ip = data.get(ip_key) or data.get('ip') or data.get('query')
                     if ip:
@@ -169,8 +253,7 @@ def get_ip_with_specific_proxy(proxy_url):
         return None
     except Exception as e:
         print(f"   ✗ Error getting IP through specific proxy: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.debug("proxy %s failed", proxy_url, exc_info=True)
         return None
 
 
@@ -180,8 +263,7 @@ def test_all_proxies():
     print("Testing IP through each available proxy")
     print("="*60)
     
-    daemon = I2PProxyDaemon()
-    available_proxies = daemon.fetch_proxies()
+    available_proxies = fetch_proxies_cached()
     
     if not available_proxies:
         print("[!] No proxies available")
@@ -1,14 +1,57 @@
 """Optimized parallel download distributing chunks across multiple proxies"""
+import asyncio
+import email.parser
+import functools
+import logging
+import os
+import re
 import sys
 import time
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from i2ptunnel import I2PProxyDaemon
 from tqdm import tqdm
 
+logger = logging.getLogger(__name__)
+if os.environ.get("DEBUG"):
+    logging.basicConfig(level=logging.DEBUG)
 
-def download_chunk_with_proxy(daemon, url, proxy_url, start_byte, end_byte, chunk_id):
-    """Download a specific byte range using HTTP Range request with a specific proxy"""
+
+# Shared daemon + TTL-cached proxy list so repeated downloads in one
+# process don't redo proxy discovery every call
+_DAEMON = None
+
+
+def _get_daemon():
+    global _DAEMON
+    if _DAEMON is None:
+        _DAEMON = I2PProxyDaemon()
+    return _DAEMON
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_fetch_proxies(ttl_bucket):
+    return _get_daemon().fetch_proxies()
+
+
+def fetch_proxies_cached(ttl=60):
+    """fetch_proxies with a TTL so hot paths skip repeated discovery"""
+    return _cached_fetch_proxies(int(time.time() // ttl))
+
+
+_PROXY = None
+
+
+def _get_proxy():
+    global _PROXY
+    if _PROXY is None:
+        from i2p_proxy import I2PProxy
+        _PROXY = I2PProxy()
+    return _PROXY
+
+
+def download_chunk_with_proxy(daemon, url, proxy_url, start_byte, end_byte, chunk_id, fd):
+    """Download a specific byte range and pwrite it into the output file"""
     try:
         headers = {
             'Range': f'bytes={start_byte}-{end_byte}'
@@ -25,15 +68,90 @@ def download_chunk_with_proxy(daemon, url, proxy_url, start_byte, end_byte, chun
         )
         
         if result["status"] in (200, 206):  # 206 = Partial Content
-            chunk_data = bytes(result["body"])
-            return chunk_id, chunk_data, True, len(chunk_data), proxy_url
+            # pwrite is thread-safe and positions independently of the
+            # shared file offset, so workers write without a lock and
+            # nothing has to be buffered for a later combine step.
+            # pwrite takes any buffer, so only copy if the FFI layer
+            # handed us something that is not already bytes-like
+            chunk_data = result["body"]
+            if not isinstance(chunk_data, (bytes, bytearray, memoryview)):
+                chunk_data = bytes(chunk_data)
+            os.pwrite(fd, chunk_data, start_byte)
+            return chunk_id, True, len(chunk_data), proxy_url
         else:
-            return chunk_id, b'', False, 0, proxy_url
+            return chunk_id, False, 0, proxy_url
+    except Exception as e:
+        # No traceback here: formatting frames while holding the print
+        # lock serializes every worker when a proxy is flapping
+        logger.debug("chunk %d failed (proxy %s): %s", chunk_id, proxy_url, e)
+        return chunk_id, False, 0, proxy_url
+
+
+def download_ranges_multipart(daemon, url, proxy_url, group, fd):
+    """Fetch all ranges for one proxy in a single multipart/byteranges GET.
+
+    Returns per-chunk result tuples, or None when the server did not
+    honor the multi-range request so the caller can fall back to
+    per-range GETs.
+    """
+    try:
+        range_header = 'bytes=' + ','.join(f'{start}-{end}' for start, end, _ in group)
+        result = daemon.make_request_with_proxy(
+            url=url,
+            proxy_url=proxy_url,
+            method="GET",
+            headers={'Range': range_header},
+            body=None,
+            stream=False
+        )
+        if result["status"] != 206:
+            return None
+        content_type = next(
+            (v for k, v in result["headers"].items() if k.lower() == 'content-type'), '')
+        if 'multipart/byteranges' not in content_type.lower():
+            return None
+
+        body = result["body"]
+        if not isinstance(body, (bytes, bytearray)):
+            body = bytes(body)
+        # The body is MIME multipart; prepend the Content-Type so the
+        # stdlib parser picks up the boundary
+        message = email.parser.BytesParser().parsebytes(
+            b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+
+        chunk_by_start = {start: idx for start, end, idx in group}
+        results = []
+        for part in message.get_payload():
+            match = re.match(r'bytes (\d+)-(\d+)/', part.get('Content-Range', ''))
+            if not match:
+                return None
+            start = int(match.group(1))
+            if start not in chunk_by_start:
+                return None
+            idx = chunk_by_start.pop(start)
+            data = part.get_payload(decode=True)
+            os.pwrite(fd, data, start)
+            results.append((idx, True, len(data), proxy_url))
+        if chunk_by_start:
+            # Server skipped ranges; redo the whole group per-range
+            return None
+        return results
     except Exception as e:
-        print(f"\n[ERROR] Chunk {chunk_id} (proxy {proxy_url}): {e}")
-        import traceback
-        traceback.print_exc()
-        return chunk_id, b'', False, 0, proxy_url
+        logger.debug("multipart range fetch failed (proxy %s): %s", proxy_url, e)
+        return None
+
+
+def _head_size(proxy, url):
+    """Probe Content-Length via HEAD, falling back to a streamed GET"""
+    try:
+        response = proxy.request('HEAD', url)
+        if response.status_code == 200:
+            return int(response.headers.get('Content-Length', 0))
+        response = proxy.get(url, stream=True)
+        return int(response.headers.get('Content-Length', 0))
+    except Exception as e:
+        print(f"[ERROR] Could not get file size: {e}")
+        return 0
 
 
 def download_parallel_optimized(url, num_threads=4, output_file="test_optimized.mp4"):
@@ -48,32 +166,23 @@ def download_parallel_optimized(url, num_threads=4, output_file="test_optimized.
     start_time = time.time()
     
     # Initialize daemon
-    daemon = I2PProxyDaemon()
-    
-    # Get file size
-    print("[*] Getting file size...")
-    from i2p_proxy import I2PProxy
-    proxy = I2PProxy()
-    try:
-        response = proxy.request('HEAD', url)
-        if response.status_code == 200:
-            file_size = int(response.headers.get('Content-Length', 0))
-        else:
-            response = proxy.get(url, stream=True)
-            file_size = int(response.headers.get('Content-Length', 0))
-    except Exception as e:
-        print(f"[ERROR] Could not get file size: {e}")
-        return False
+    daemon = _get_daemon()
     
+    # The HEAD size probe and proxy discovery are independent network
+    # round trips - overlap them so startup costs max() rather than sum()
+    print("[*] Getting file size and fetching proxies...")
+    proxy = _get_proxy()
+    with ThreadPoolExecutor(max_workers=2) as startup_pool:
+        size_future = startup_pool.submit(_head_size, proxy, url)
+        proxies_future = startup_pool.submit(fetch_proxies_cached)
+        file_size = size_future.result()
+        available_proxies = proxies_future.result()
+
     if file_size == 0:
         print("[ERROR] Could not determine file size")
         return False
-    
+
     print(f"[*] File size: {file_size / 1024 / 1024:.2f} MB ({file_size:,} bytes)\n")
-    
-    # Get available proxies
-    print("[*] Fetching available proxies...")
-    available_proxies = daemon.fetch_proxies()
     print(f"[*] Found {len(available_proxies)} available proxies")
     
     if len(available_proxies) == 0:
@@ -110,66 +219,92 @@ def download_parallel_optimized(url, num_threads=4, output_file="test_optimized.
         print(f"   Chunk {idx}: bytes {start:,} - {end:,} ({(end-start+1)/1024/1024:.2f} MB) -> {proxy}")
     print()
     
-    # Download chunks in parallel, each using assigned proxy
-    downloaded_data = [None] * num_threads
+    # Download chunks in parallel, each using assigned proxy.
+    # Each worker pwrites its range straight into the output file, so
+    # peak memory stays at O(chunk size x threads), not O(file size).
+    output_path = Path(output_file)
+    fd = os.open(output_file, os.O_WRONLY | os.O_CREAT, 0o644)
+    os.ftruncate(fd, file_size)
     completed_chunks = 0
     proxy_usage = {}
     
     print("[*] Starting optimized parallel download...\n")
-    
-    with tqdm(total=file_size, unit='B', unit_scale=True, unit_divisor=1024,
-             desc="Downloading", 
-             bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]',
-             ncols=80) as pbar:
-        
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            # Submit all chunks, each with its assigned proxy
-            future_to_chunk = {
-                executor.submit(
+
+    # Group ranges by proxy: when chunks outnumber proxies, issuing a
+    # proxy's ranges back-to-back rides the warm connection state
+    # instead of paying the SOCKS/I2P handshake once per chunk
+    chunks_by_proxy = {}
+    for start, end, idx, proxy_url in chunks:
+        chunks_by_proxy.setdefault(proxy_url, []).append((start, end, idx))
+
+    async def run_downloads(pbar):
+        total_written = 0
+        failed = False
+
+        async def fetch_group(proxy_url, group):
+            nonlocal completed_chunks, total_written, failed
+            # First try to collapse the whole group into one
+            # multipart/byteranges round trip
+            if len(group) > 1:
+                results = await asyncio.to_thread(
+                    download_ranges_multipart, daemon, url, proxy_url, group, fd
+                )
+                if results is not None:
+                    for chunk_id, success, chunk_len, proxy_used in results:
+                        completed_chunks += 1
+                        total_written += chunk_len
+                        proxy_usage[chunk_id] = proxy_used
+                        pbar.update(chunk_len)
+                    return
+            # Fallback: serial per-range GETs within a proxy, parallel
+            # across proxies; the blocking daemon FFI call is 99%
+            # socket-wait so it runs in a thread via to_thread
+            for start, end, idx in group:
+                if failed:
+                    return
+                chunk_id, success, chunk_len, proxy_used = await asyncio.to_thread(
                     download_chunk_with_proxy,
-                    daemon,
-                    url,
-                    proxy_url,
-                    start,
-                    end,
-                    idx
-                ): idx
-                for start, end, idx, proxy_url in chunks
-            }
-            
-            # Process completed chunks
-            for future in as_completed(future_to_chunk):
-                chunk_id, chunk_data, success, chunk_len, proxy_used = future.result()
+                    daemon, url, proxy_url, start, end, idx, fd
+                )
                 if success:
-                    downloaded_data[chunk_id] = chunk_data
                     completed_chunks += 1
+                    total_written += chunk_len
                     proxy_usage[chunk_id] = proxy_used
                     pbar.update(chunk_len)
                 else:
                     print(f"\n[ERROR] Failed to download chunk {chunk_id}")
-                    return False
-    
+                    failed = True
+
+        await asyncio.gather(
+            *(fetch_group(proxy_url, group) for proxy_url, group in chunks_by_proxy.items())
+        )
+        return None if failed else total_written
+
+    with tqdm(total=file_size, unit='B', unit_scale=True, unit_divisor=1024,
+             desc="Downloading",
+             bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]',
+             ncols=80) as pbar:
+
+        try:
+            total_written = asyncio.run(run_downloads(pbar))
+        finally:
+            os.close(fd)
+
+    if total_written is None:
+        return False
+
     elapsed_time = time.time() - start_time
-    
+
     # Verify all chunks downloaded
     if completed_chunks != num_threads:
         print(f"\n[ERROR] Only downloaded {completed_chunks}/{num_threads} chunks")
         return False
-    
-    # Combine chunks in order
-    print("\n[*] Combining chunks...")
-    combined_data = b''.join(downloaded_data)
-    
-    if len(combined_data) != file_size:
-        print(f"[WARNING] Downloaded {len(combined_data)} bytes, expected {file_size}")
-    
-    # Save file
-    output_path = Path(output_file)
-    with open(output_path, 'wb') as f:
-        f.write(combined_data)
-    
+
+    if total_written != file_size:
+        print(f"[WARNING] Downloaded {total_written} bytes, expected {file_size}")
+
     # Calculate stats
-    download_speed = len(combined_data) / elapsed_time / 1024 / 1024
+    download_speed = total_written / elapsed_time / 1024 / 1024
     mbps = download_speed * 8
     
     # Count unique proxies used
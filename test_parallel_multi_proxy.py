@@ -1,32 +1,222 @@
 """Test parallel chunk downloading with multiple proxies simultaneously"""
+import mmap
+import os
 import sys
 import time
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from i2p_proxy import I2PProxy
 from i2ptunnel import I2PProxyDaemon
+from test_parallel_download import _pin_worker, probe_file
 from tqdm import tqdm
 
 
-def download_chunk_with_proxy(proxy_instance, url, start_byte, end_byte, chunk_id, proxy_name=""):
-    """Download a specific byte range using HTTP Range request with a specific proxy instance"""
-    try:
-        headers = {
-            'Range': f'bytes={start_byte}-{end_byte}'
-        }
-        response = proxy_instance.get(url, headers=headers, stream=True)
-        
-        if response.status_code in (200, 206):  # 206 = Partial Content
-            chunk_data = b''
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    chunk_data += chunk
-            return chunk_id, chunk_data, True, len(chunk_data), proxy_name
-        else:
-            return chunk_id, b'', False, 0, proxy_name
-    except Exception as e:
-        print(f"\n[ERROR] Chunk {chunk_id} (proxy {proxy_name}): {e}")
-        return chunk_id, b'', False, 0, proxy_name
+# One daemon and a reusable pool of proxy instances for the whole
+# process - repeated benchmark runs would otherwise redo daemon setup
+# and per-instance handshakes every call
+_DAEMON = None
+_PROXY_POOL = []
+
+
+def _get_daemon():
+    global _DAEMON
+    if _DAEMON is None:
+        _DAEMON = I2PProxyDaemon()
+    return _DAEMON
+
+
+def get_proxy_pool(n):
+    """Return n proxy instances, growing the shared pool as needed"""
+    while len(_PROXY_POOL) < n:
+        _PROXY_POOL.append(I2PProxy(daemon=_get_daemon()))
+    return _PROXY_POOL[:n]
+
+
+def download_chunk_with_proxy(proxy_instance, url, start_byte, end_byte, chunk_id, mm, proxy_name="", pbar=None, retries=3):
+    """Download a byte range through a specific proxy straight into the mapped output.
+
+    Transient I2P failures are common, so each range retries with
+    exponential backoff (0.5/1/2 s) before being reported as failed.
+    """
+    _pin_worker()
+    for attempt in range(retries):
+        flushed = 0
+        try:
+            # identity encoding: compressed bodies would break byte-range
+            # offsets and burn CPU decompressing on the hot path
+            headers = {
+                'Range': f'bytes={start_byte}-{end_byte}',
+                'Accept-Encoding': 'identity'
+            }
+            response = proxy_instance.get(url, headers=headers, stream=True)
+
+            if response.status_code in (200, 206):  # 206 = Partial Content
+                # Disjoint ranges, so the shared mmap needs no lock and no
+                # per-chunk accumulation buffer
+                write_pos = start_byte
+                # Batch progress updates: tqdm takes a lock and recomputes
+                # rates on every update, so flush at most once per MB
+                pending = 0
+                for chunk in response.iter_content(chunk_size=262144):
+                    if chunk:
+                        mm[write_pos:write_pos + len(chunk)] = chunk
+                        write_pos += len(chunk)
+                        pending += len(chunk)
+                        if pbar and pending >= 1024 * 1024:
+                            pbar.update(pending)
+                            flushed += pending
+                            pending = 0
+                if pbar and pending:
+                    pbar.update(pending)
+                return chunk_id, True, write_pos - start_byte, proxy_name
+        except Exception as e:
+            print(f"\n[ERROR] Chunk {chunk_id} (proxy {proxy_name}, "
+                  f"attempt {attempt + 1}/{retries}): {e}")
+            # Roll back progress counted for the aborted attempt so the
+            # retry does not double-count its bytes
+            if pbar and flushed:
+                pbar.update(-flushed)
+        if attempt + 1 < retries:
+            time.sleep(0.5 * 2 ** attempt)
+    return chunk_id, False, 0, proxy_name
+
+
+def _run_parallel(url, num_threads, output_file, proxy_for_chunk, proxy_name_for_chunk):
+    """Shared driver for the parallel download paths.
+
+    Plans the chunks, maps the output and reaps the workers once;
+    ``proxy_for_chunk(idx)`` / ``proxy_name_for_chunk(idx)`` decide
+    which proxy instance serves each chunk, which is the only thing the
+    multi- and single-proxy tests actually differ in. Returns a stats
+    dict on success, None on failure.
+    """
+    start_time = time.time()
+
+    # Size and range support come back from one 1-byte probe
+    print("[*] Probing file size and range support...")
+    proxy = get_proxy_pool(1)[0]
+    file_size, supports_range = probe_file(proxy, url)
+
+    if file_size == 0:
+        print("[ERROR] Could not determine file size")
+        return None
+
+    print(f"[*] File size: {file_size / 1024 / 1024:.2f} MB ({file_size:,} bytes)\n")
+
+    if not supports_range:
+        print("[ERROR] Server does not honor Range requests; "
+              "parallel chunk download would corrupt the output")
+        return None
+
+    # Chunk plan in closed form; the last chunk absorbs the remainder.
+    # One summary line instead of a print per chunk - at high thread
+    # counts the per-chunk stdout writes are pure overhead
+    chunk_size = file_size // num_threads
+    chunks = [
+        (i * chunk_size,
+         file_size - 1 if i == num_threads - 1 else (i + 1) * chunk_size - 1,
+         i)
+        for i in range(num_threads)
+    ]
+
+    print(f"[*] Splitting into {num_threads} parallel chunks of "
+          f"~{chunk_size / 1024 / 1024:.2f} MB\n")
+
+    # Pre-size the output file and map it so workers write their byte
+    # ranges in place - no per-chunk buffers and no final combine pass
+    output_path = Path(output_file)
+    with open(output_path, 'wb') as f:
+        f.truncate(file_size)
+        # truncate alone leaves a sparse file, so the first write into
+        # each block stalls on extent allocation under the concurrent
+        # writers; fallocate reserves the blocks up front where the
+        # platform supports it
+        try:
+            os.posix_fallocate(f.fileno(), 0, file_size)
+        except (OSError, AttributeError):
+            pass
+
+    completed_chunks = 0
+    total_downloaded = 0
+    proxy_usage = {}
+
+    print("[*] Starting parallel download...\n")
+
+    with open(output_path, 'r+b') as f, \
+            mmap.mmap(f.fileno(), file_size) as mm:
+        with tqdm(total=file_size, unit='B', unit_scale=True, unit_divisor=1024,
+                 mininterval=0.5, smoothing=0,
+                 desc="Downloading",
+                 bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]',
+                 ncols=80) as pbar:
+
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                future_to_chunk = {
+                    executor.submit(
+                        download_chunk_with_proxy,
+                        proxy_for_chunk(idx),
+                        url,
+                        start,
+                        end,
+                        idx,
+                        mm,
+                        proxy_name_for_chunk(idx),
+                        pbar
+                    ): idx
+                    for start, end, idx in chunks
+                }
+
+                # Reap completed chunks (progress is updated by the
+                # workers as bytes arrive); ranges that exhausted their
+                # per-chunk retries get one resubmission round before
+                # the download is declared failed
+                failed = []
+                for future in as_completed(future_to_chunk):
+                    chunk_id, success, chunk_len, proxy_name = future.result()
+                    if success:
+                        completed_chunks += 1
+                        total_downloaded += chunk_len
+                        proxy_usage[chunk_id] = proxy_name
+                    else:
+                        failed.append(chunks[chunk_id])
+
+                if failed:
+                    print(f"\n[*] Retrying {len(failed)} failed chunk(s)...")
+                    retry_futures = {
+                        executor.submit(
+                            download_chunk_with_proxy,
+                            proxy_for_chunk(idx),
+                            url, start, end, idx, mm,
+                            proxy_name_for_chunk(idx), pbar
+                        ): idx
+                        for start, end, idx in failed
+                    }
+                    for future in as_completed(retry_futures):
+                        chunk_id, success, chunk_len, proxy_name = future.result()
+                        if success:
+                            completed_chunks += 1
+                            total_downloaded += chunk_len
+                            proxy_usage[chunk_id] = proxy_name
+                        else:
+                            print(f"\n[ERROR] Failed to download chunk {chunk_id}")
+                            return None
+
+    elapsed_time = time.time() - start_time
+
+    if completed_chunks != num_threads:
+        print(f"\n[ERROR] Only downloaded {completed_chunks}/{num_threads} chunks")
+        return None
+
+    if total_downloaded != file_size:
+        print(f"[WARNING] Downloaded {total_downloaded} bytes, expected {file_size}")
+
+    return {
+        'output_path': output_path,
+        'file_size': file_size,
+        'elapsed_time': elapsed_time,
+        'total_downloaded': total_downloaded,
+        'proxy_usage': proxy_usage,
+    }
 
 
 def download_parallel_multi_proxy(url, num_threads=4, output_file="test_parallel_multi.mp4"):
@@ -37,134 +227,40 @@ def download_parallel_multi_proxy(url, num_threads=4, output_file="test_parallel
     print(f"URL: {url}")
     print(f"Threads: {num_threads}")
     print(f"{'='*60}\n")
-    
-    start_time = time.time()
-    
-    # Initialize daemon to get available proxies
-    daemon = I2PProxyDaemon()
-    
-    # Get file size
-    print("[*] Getting file size...")
-    proxy = I2PProxy()
-    try:
-        response = proxy.request('HEAD', url)
-        if response.status_code == 200:
-            file_size = int(response.headers.get('Content-Length', 0))
-        else:
-            response = proxy.get(url, stream=True)
-            file_size = int(response.headers.get('Content-Length', 0))
-    except Exception as e:
-        print(f"[ERROR] Could not get file size: {e}")
-        return False
-    
-    if file_size == 0:
-        print("[ERROR] Could not determine file size")
-        return False
-    
-    print(f"[*] File size: {file_size / 1024 / 1024:.2f} MB ({file_size:,} bytes)\n")
-    
+
     # Get available proxies
     print("[*] Fetching available proxies...")
-    available_proxies = daemon.fetch_proxies()
+    available_proxies = _get_daemon().fetch_proxies()
     print(f"[*] Found {len(available_proxies)} available proxies")
-    
-    # Create multiple proxy instances - one per thread
-    # Each proxy instance will use the shared daemon but can route through different proxies
+
+    # Create multiple proxy instances - one per thread, all sharing the
+    # daemon so its connection/tunnel state is reused instead of paying
+    # the I2P handshake once per instance
     print(f"[*] Creating {num_threads} proxy instances for parallel downloads...\n")
-    proxy_instances = [I2PProxy() for _ in range(num_threads)]
-    
-    # Calculate chunk sizes
-    chunk_size = file_size // num_threads
-    chunks = []
-    for i in range(num_threads):
-        start = i * chunk_size
-        if i == num_threads - 1:
-            end = file_size - 1  # Last chunk gets remainder
-        else:
-            end = start + chunk_size - 1
-        chunks.append((start, end, i))
-    
-    print(f"[*] Splitting into {num_threads} parallel chunks:")
-    for start, end, idx in chunks:
-        print(f"   Chunk {idx}: bytes {start:,} - {end:,} ({(end-start+1)/1024/1024:.2f} MB)")
-    print()
-    
-    # Download chunks in parallel, each using a different proxy instance
-    downloaded_data = [None] * num_threads
-    completed_chunks = 0
-    total_downloaded = 0
-    proxy_usage = {}
-    
-    print("[*] Starting parallel download with multiple proxies...\n")
-    
-    # Create progress bar
-    with tqdm(total=file_size, unit='B', unit_scale=True, unit_divisor=1024,
-             desc="Downloading", 
-             bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]',
-             ncols=80) as pbar:
-        
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            # Submit all chunks, each using a different proxy instance
-            future_to_chunk = {
-                executor.submit(
-                    download_chunk_with_proxy, 
-                    proxy_instances[idx], 
-                    url, 
-                    start, 
-                    end, 
-                    idx,
-                    f"proxy-{idx}"
-                ): idx
-                for start, end, idx in chunks
-            }
-            
-            # Process completed chunks
-            for future in as_completed(future_to_chunk):
-                chunk_id, chunk_data, success, chunk_len, proxy_name = future.result()
-                if success:
-                    downloaded_data[chunk_id] = chunk_data
-                    completed_chunks += 1
-                    total_downloaded += chunk_len
-                    proxy_usage[chunk_id] = proxy_name
-                    pbar.update(chunk_len)
-                else:
-                    print(f"\n[ERROR] Failed to download chunk {chunk_id}")
-                    return False
-    
-    elapsed_time = time.time() - start_time
-    
-    # Verify all chunks downloaded
-    if completed_chunks != num_threads:
-        print(f"\n[ERROR] Only downloaded {completed_chunks}/{num_threads} chunks")
+    proxy_instances = get_proxy_pool(num_threads)
+
+    stats = _run_parallel(
+        url, num_threads, output_file,
+        proxy_for_chunk=lambda idx: proxy_instances[idx],
+        proxy_name_for_chunk=lambda idx: f"proxy-{idx}"
+    )
+    if stats is None:
         return False
-    
-    # Combine chunks in order
-    print("\n[*] Combining chunks...")
-    combined_data = b''.join(downloaded_data)
-    
-    if len(combined_data) != file_size:
-        print(f"[WARNING] Downloaded {len(combined_data)} bytes, expected {file_size}")
-    
-    # Save file
-    output_path = Path(output_file)
-    with open(output_path, 'wb') as f:
-        f.write(combined_data)
-    
-    # Calculate stats
-    download_speed = len(combined_data) / elapsed_time / 1024 / 1024  # MB/s
+
+    download_speed = stats['total_downloaded'] / stats['elapsed_time'] / 1024 / 1024  # MB/s
     mbps = download_speed * 8  # Mbps
-    
+
     print(f"\n{'='*60}")
     print(f"[SUCCESS] Multi-Proxy Parallel Download Complete!")
     print(f"{'='*60}")
-    print(f"File: {output_path.absolute()}")
-    print(f"Size: {file_size / 1024 / 1024:.2f} MB ({file_size:,} bytes)")
-    print(f"Time: {elapsed_time:.2f} seconds")
+    print(f"File: {stats['output_path'].absolute()}")
+    print(f"Size: {stats['file_size'] / 1024 / 1024:.2f} MB ({stats['file_size']:,} bytes)")
+    print(f"Time: {stats['elapsed_time']:.2f} seconds")
     print(f"Speed: {download_speed:.2f} MB/s ({mbps:.2f} Mbps)")
     print(f"Threads: {num_threads} parallel chunks")
-    print(f"Proxies used: {len(set(proxy_usage.values()))} different proxy instances")
+    print(f"Proxies used: {len(set(stats['proxy_usage'].values()))} different proxy instances")
     print(f"{'='*60}\n")
-    
+
     return True
 
 
@@ -173,80 +269,23 @@ def download_parallel_single_proxy(url, num_threads=4, output_file="test_paralle
     print(f"\n{'='*60}")
     print(f"Single-Proxy Parallel Download (for comparison)")
     print(f"{'='*60}\n")
-    
-    start_time = time.time()
-    
-    proxy = I2PProxy()
-    
-    # Get file size
-    try:
-        response = proxy.request('HEAD', url)
-        if response.status_code == 200:
-            file_size = int(response.headers.get('Content-Length', 0))
-        else:
-            response = proxy.get(url, stream=True)
-            file_size = int(response.headers.get('Content-Length', 0))
-    except Exception as e:
-        print(f"[ERROR] Could not get file size: {e}")
-        return False
-    
-    if file_size == 0:
-        print("[ERROR] Could not determine file size")
-        return False
-    
-    # Calculate chunk sizes
-    chunk_size = file_size // num_threads
-    chunks = []
-    for i in range(num_threads):
-        start = i * chunk_size
-        if i == num_threads - 1:
-            end = file_size - 1
-        else:
-            end = start + chunk_size - 1
-        chunks.append((start, end, i))
-    
-    # Download chunks in parallel, all using same proxy
-    downloaded_data = [None] * num_threads
-    completed_chunks = 0
-    
-    with tqdm(total=file_size, unit='B', unit_scale=True, unit_divisor=1024,
-             desc="Downloading", 
-             bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}, {rate_fmt}]',
-             ncols=80) as pbar:
-        
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            future_to_chunk = {
-                executor.submit(download_chunk_with_proxy, proxy, url, start, end, idx, "single"): idx
-                for start, end, idx in chunks
-            }
-            
-            for future in as_completed(future_to_chunk):
-                chunk_id, chunk_data, success, chunk_len, _ = future.result()
-                if success:
-                    downloaded_data[chunk_id] = chunk_data
-                    completed_chunks += 1
-                    pbar.update(chunk_len)
-                else:
-                    print(f"\n[ERROR] Failed to download chunk {chunk_id}")
-                    return False
-    
-    elapsed_time = time.time() - start_time
-    
-    if completed_chunks != num_threads:
-        print(f"\n[ERROR] Only downloaded {completed_chunks}/{num_threads} chunks")
+
+    proxy = get_proxy_pool(1)[0]
+
+    stats = _run_parallel(
+        url, num_threads, output_file,
+        proxy_for_chunk=lambda idx: proxy,
+        proxy_name_for_chunk=lambda idx: "single"
+    )
+    if stats is None:
         return False
-    
-    combined_data = b''.join(downloaded_data)
-    output_path = Path(output_file)
-    with open(output_path, 'wb') as f:
-        f.write(combined_data)
-    
-    download_speed = len(combined_data) / elapsed_time / 1024 / 1024
-    
+
+    download_speed = stats['total_downloaded'] / stats['elapsed_time'] / 1024 / 1024
+
     print(f"\n[SUCCESS] Single-proxy parallel download complete!")
-    print(f"Time: {elapsed_time:.2f} seconds")
+    print(f"Time: {stats['elapsed_time']:.2f} seconds")
     print(f"Speed: {download_speed:.2f} MB/s ({download_speed * 8:.2f} Mbps)\n")
-    
+
     return True
 
 
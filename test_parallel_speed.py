@@ -1,16 +1,82 @@
 """Test parallel chunk downloading with HTTP Range requests and progress bar"""
+import asyncio
+import functools
+import os
 import sys
+import threading
 import time
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from i2p_proxy import I2PProxy
 from i2ptunnel import I2PProxyDaemon
+from test_parallel_download import probe_file
 from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeElapsedColumn, TimeRemainingColumn, TransferSpeedColumn, DownloadColumn
 from rich.console import Console
 
 
-def download_chunk_range_with_proxy(daemon, url, start_byte, end_byte, chunk_id, proxy_url, router_port=None, progress=None, task_id=None, overall_task_id=None):
-    """Download a specific byte range using HTTP Range request through a specific proxy"""
+# Streaming chunk size for the daemon FFI: every chunk costs a GIL
+# reacquisition and a buffer materialization, so 64 KiB cuts boundary
+# crossings 8x versus the old 8 KiB. Overridable from the CLI.
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Shared daemon + TTL-cached proxy list: daemon construction and
+# fetch_proxies are router round trips that would otherwise dominate
+# repeated benchmark runs in one process
+_DAEMON = None
+
+
+def _get_daemon():
+    global _DAEMON
+    if _DAEMON is None:
+        _DAEMON = I2PProxyDaemon()
+    return _DAEMON
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_fetch_proxies(ttl_bucket):
+    return _get_daemon().fetch_proxies()
+
+
+def fetch_proxies_cached(ttl=60):
+    """fetch_proxies with a TTL so hot paths skip repeated discovery"""
+    return _cached_fetch_proxies(int(time.time() // ttl))
+
+
+# Per-thread reusable flush buffer: allocating a fresh accumulator per
+# range (let alone per chunk) churns the allocator for no reason, and
+# each pool thread serves many ranges over a run
+_worker_state = threading.local()
+
+
+def _flush_buffer():
+    buf = getattr(_worker_state, 'buf', None)
+    if buf is None:
+        buf = _worker_state.buf = bytearray()
+    else:
+        del buf[:]
+    return buf
+
+
+def get_available_router_ports(candidates=(4444, 4445, 4446, 4447, 4448, 4449),
+                               timeout=0.5):
+    """Probe candidate router proxy ports and return the reachable ones.
+
+    Hardcoding [4444, 4447] parks every extra worker behind one of two
+    tunnels; probing lets the fan-out use however many HTTP/SOCKS
+    proxy instances the router actually exposes. Falls back to 4444
+    when nothing answers so the request itself can still report the
+    error.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from test_i2p_router_config import test_port
+    with ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+        reachable = list(pool.map(
+            lambda port: test_port("127.0.0.1", port, timeout), candidates))
+    ports = [port for port, ok in zip(candidates, reachable) if ok]
+    return ports or [4444]
+
+
+def download_chunk_range_with_proxy(daemon, url, start_byte, end_byte, chunk_id, proxy_url, fd, router_port=None, progress=None, task_id=None, overall_task_id=None):
+    """Download a byte range through a specific proxy and pwrite it into fd"""
     try:
         # Convert headers dict
         headers_dict = {
@@ -24,29 +90,56 @@ def download_chunk_range_with_proxy(daemon, url, start_byte, end_byte, chunk_id,
             method="GET",
             headers=headers_dict,
             body=None,
-            chunk_size=8192,
+            chunk_size=min(STREAM_CHUNK_SIZE, end_byte - start_byte + 1),
             router_port=router_port  # Use specific router port for this chunk
         )
         
         if result["status"] in (200, 206):  # 206 = Partial Content
-            chunk_data = b''
+            # Accumulate into a small buffer and pwrite it at the
+            # range's absolute offset every ~1 MiB: the worker holds one
+            # flush buffer instead of its whole range, and pwrite is
+            # thread-safe with no shared file position, so no payload
+            # ever travels back through the futures result slot
+            pending = _flush_buffer()
+            written = 0
+            # Rich serializes progress.update under one lock shared by
+            # all workers, so report at most every 1 MiB or 50 ms
+            unreported = 0
+            last_report = time.monotonic()
             for chunk in result["chunks"]:
-                chunk_bytes = bytes(chunk)
-                chunk_data += chunk_bytes
-                if progress:
+                n = len(chunk)
+                pending += chunk
+                unreported += n
+                if progress and (unreported >= 1024 * 1024
+                                 or time.monotonic() - last_report > 0.05):
                     if task_id is not None:
-                        progress.update(task_id, advance=len(chunk_bytes))
+                        progress.update(task_id, advance=unreported)
                     if overall_task_id is not None:
-                        progress.update(overall_task_id, advance=len(chunk_bytes))
+                        progress.update(overall_task_id, advance=unreported)
+                    unreported = 0
+                    last_report = time.monotonic()
+                if len(pending) >= 1024 * 1024:
+                    os.pwrite(fd, pending, start_byte + written)
+                    written += len(pending)
+                    del pending[:]
+            if pending:
+                os.pwrite(fd, pending, start_byte + written)
+                written += len(pending)
+            if progress and unreported:
+                if task_id is not None:
+                    progress.update(task_id, advance=unreported)
+                if overall_task_id is not None:
+                    progress.update(overall_task_id, advance=unreported)
             proxy_used = result.get("proxy_used", proxy_url)
-            return chunk_id, chunk_data, True, len(chunk_data), proxy_used
+            return chunk_id, True, written, proxy_used
         else:
-            return chunk_id, b'', False, 0, f"Status {result['status']}"
+            return chunk_id, False, 0, f"Status {result['status']}"
     except Exception as e:
-        return chunk_id, b'', False, 0, str(e)
+        return chunk_id, False, 0, str(e)
 
 
-def download_parallel(proxy, url, num_threads=4, output_file="test_parallel.mp4"):
+def download_parallel(proxy, url, num_threads=4, output_file="test_parallel.mp4",
+                      range_size=4 * 1024 * 1024):
     """Download file in parallel chunks with progress bar"""
     print(f"\n{'='*60}")
     print(f"Parallel Download Speed Test")
@@ -57,52 +150,38 @@ def download_parallel(proxy, url, num_threads=4, output_file="test_parallel.mp4"
     
     start_time = time.time()
     
-    # First, get file size with HEAD request
-    print("[*] Getting file size...")
-    try:
-        # Try HEAD request
-        response = proxy.request('HEAD', url)
-        if response.status_code == 200:
-            file_size = int(response.headers.get('Content-Length', 0))
-        else:
-            # Fallback: try GET with stream (just for headers)
-            response = proxy.get(url, stream=True)
-            file_size = int(response.headers.get('Content-Length', 0))
-    except Exception as e:
-        # If HEAD fails, try GET
-        try:
-            response = proxy.get(url, stream=True)
-            file_size = int(response.headers.get('Content-Length', 0))
-        except Exception as e2:
-            print(f"[ERROR] Could not get file size: {e2}")
-            return False
-    
+    # One 1-byte ranged GET yields the size from Content-Range and
+    # proves range support - the old HEAD-then-streamed-GET cascade
+    # could open a full-body download just to read one header
+    print("[*] Probing file size and range support...")
+    file_size, supports_range = probe_file(proxy, url)
+
     if file_size == 0:
         print("[ERROR] Could not determine file size")
         return False
-    
+
     print(f"[*] File size: {file_size / 1024 / 1024:.2f} MB ({file_size:,} bytes)\n")
-    
-    # Calculate chunk sizes
-    chunk_size = file_size // num_threads
+
+    if not supports_range:
+        print("[WARNING] Server does not honor Range requests; "
+              "falling back to single stream")
+        return download_single_stream(proxy, url, output_file=output_file)
+    
+    # Many small ranges with concurrency capped separately: parallelism
+    # is no longer tied to chunk count, and fast proxies pull more
+    # ranges while slow ones pull fewer
+    chunk_size = min(range_size, max(1, file_size // num_threads))
     chunks = []
-    for i in range(num_threads):
-        start = i * chunk_size
-        if i == num_threads - 1:
-            end = file_size - 1  # Last chunk gets remainder
-        else:
-            end = start + chunk_size - 1
+    for i, start in enumerate(range(0, file_size, chunk_size)):
+        end = min(start + chunk_size - 1, file_size - 1)
         chunks.append((start, end, i))
-    
-    print(f"[*] Splitting into {num_threads} parallel chunks:")
-    for start, end, idx in chunks:
-        print(f"   Chunk {idx}: bytes {start:,} - {end:,} ({(end-start+1)/1024/1024:.2f} MB)")
-    print()
+
+    print(f"[*] Splitting into {len(chunks)} ranges of up to "
+          f"{chunk_size / 1024 / 1024:.2f} MB, {num_threads} in flight\n")
     
     # Get available proxies and assign them to chunks
-    from i2ptunnel import I2PProxyDaemon
-    daemon = I2PProxyDaemon()
-    available_proxies = daemon.fetch_proxies()
+    daemon = _get_daemon()
+    available_proxies = fetch_proxies_cached()
     
     if not available_proxies:
         print("[ERROR] No proxies available")
@@ -126,24 +205,48 @@ def download_parallel(proxy, url, num_threads=4, output_file="test_parallel.mp4"
     print(f"[*] Found {len(proxy_urls)} available proxies:")
     for i, proxy_url in enumerate(proxy_urls):
         print(f"   Proxy {i}: {proxy_url[:60]}")
-    print(f"[*] Distributing {num_threads} chunks across {len(proxy_urls)} proxies")
+    print(f"[*] Distributing {len(chunks)} ranges across {len(proxy_urls)} proxies")
     
-    # Available router ports: HTTP (4444) and SOCKS (4447 for i2pd)
-    # Use different router ports for different chunks to get true parallelism
-    # For i2pd: 4444 = HTTP, 4447 = SOCKS (default)
-    router_ports = [4444, 4447]  # HTTP and SOCKS proxy ports
+    # Discover which router proxy ports actually answer instead of
+    # assuming the i2pd defaults; each reachable port is an independent
+    # tunnel the fan-out can ride
+    router_ports = get_available_router_ports()
     print(f"[*] Using router ports {router_ports} for parallel connections")
-    print(f"    (Port 4444 = HTTP, Port 4447 = SOCKS for i2pd)\n")
-    
-    # Download chunks in parallel
-    downloaded_data = [None] * num_threads
+    print(f"    (typically 4444 = HTTP, 4447 = SOCKS for i2pd)\n")
+
+    # Real concurrency is bounded by the proxy x port fan-out: extra
+    # workers beyond that share a (proxy, port) tunnel and only add
+    # contention, since I2P tunnels multiplex poorly
+    max_useful = len(proxy_urls) * len(router_ports)
+    if num_threads > max_useful:
+        print(f"[WARNING] {num_threads} threads requested but only "
+              f"{len(proxy_urls)} proxies x {len(router_ports)} ports = "
+              f"{max_useful} independent tunnels; capping at {max_useful}\n")
+        num_threads = max_useful
+    
+    # Pre-size the output file so workers can pwrite their ranges in
+    # place - the main thread never materializes the whole file
+    output_path = Path(output_file)
+    fd = os.open(output_file, os.O_WRONLY | os.O_CREAT, 0o644)
+    os.ftruncate(fd, file_size)
+    # ftruncate alone leaves a sparse file, so the first pwrite into
+    # each block stalls on filesystem extent allocation and serializes
+    # the workers; fallocate reserves the blocks up front where the
+    # platform supports it
+    try:
+        os.posix_fallocate(fd, 0, file_size)
+    except (OSError, AttributeError):
+        pass
+
+    # Download chunks in parallel; pre-size the usage dict so the reap
+    # loop never resizes it
     completed_chunks = 0
     total_downloaded = 0
-    proxy_usage = {}
-    
+    proxy_usage = dict.fromkeys(proxy_urls, 0)
+
     console = Console()
     console.print("[*] Starting parallel download with multiple proxies...\n", style="cyan")
-    
+
     # Create rich progress display with multiple tasks (like uv)
     with Progress(
         SpinnerColumn(),
@@ -157,82 +260,84 @@ def download_parallel(proxy, url, num_threads=4, output_file="test_parallel.mp4"
         console=console,
         expand=True
     ) as progress:
-        # Create overall task
+        # Create overall task (no per-range task rows - with many small
+        # ranges they would swamp the display)
         overall_task = progress.add_task(
             "[cyan]Downloading",
             total=file_size,
         )
-        
-        # Create individual chunk tasks
-        chunk_tasks = {}
-        for start, end, idx in chunks:
-            chunk_size = end - start + 1
-            task_id = progress.add_task(
-                f"[green]Chunk {idx}",
-                total=chunk_size,
+
+        # One asyncio loop drives the fan-out: a semaphore caps ranges
+        # in flight at num_threads, and each blocking daemon call runs
+        # via to_thread. aiohttp does not apply - the transfer happens
+        # inside the daemon, not over a Python socket.
+        async def run_downloads():
+            semaphore = asyncio.Semaphore(num_threads)
+
+            # Group ranges by (proxy_url, router_port) and issue each
+            # group's requests back-to-back: consecutive requests on the
+            # same proxy/port ride the daemon's warm connection and
+            # tunnel state instead of paying the I2P cold start per
+            # range. The daemon API does not accept an external
+            # connection handle, so warmth lives in request ordering.
+            # Enumerate the full proxy x port cross product so every
+            # tunnel gets its own lane - indexing the two lists
+            # independently yields only lcm(n_proxies, n_ports) distinct
+            # pairs and leaves the remaining tunnels idle
+            lanes = [(proxy_url, router_port)
+                     for proxy_url in proxy_urls
+                     for router_port in router_ports]
+            groups = {}
+            for start, end, idx in chunks:
+                key = lanes[idx % len(lanes)]
+                groups.setdefault(key, []).append((start, end, idx))
+
+            async def fetch_group(key, group):
+                proxy_url, router_port = key
+                out = []
+                for start, end, idx in group:
+                    async with semaphore:
+                        out.append(await asyncio.to_thread(
+                            download_chunk_range_with_proxy,
+                            daemon, url, start, end, idx, proxy_url, fd,
+                            router_port, progress, None, overall_task
+                        ))
+                return out
+
+            group_results = await asyncio.gather(
+                *(fetch_group(key, group) for key, group in groups.items())
             )
-            chunk_tasks[idx] = task_id
-        
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            # Submit all chunks with proxy assignment
-            # Distribute chunks across available proxies AND router ports for true parallelism
-            future_to_chunk = {
-                executor.submit(
-                    download_chunk_range_with_proxy, 
-                    daemon, 
-                    url, 
-                    start, 
-                    end, 
-                    idx, 
-                    proxy_urls[idx % len(proxy_urls)],
-                    router_ports[idx % len(router_ports)],  # Use different router ports
-                    progress,  # Pass progress object
-                    chunk_tasks[idx],  # Pass task ID for this chunk
-                    overall_task  # Pass overall task ID for real-time updates
-                ): idx
-                for start, end, idx in chunks
-            }
-            
-            # Process completed chunks
-            for future in as_completed(future_to_chunk):
-                chunk_id, chunk_data, success, chunk_len, proxy_info = future.result()
-                if success:
-                    downloaded_data[chunk_id] = chunk_data
-                    completed_chunks += 1
-                    total_downloaded += chunk_len
-                    # Mark chunk task as complete (progress already updated in real-time during download)
-                    progress.stop_task(chunk_tasks[chunk_id])
-                    
-                    # Track proxy usage
-                    proxy_key = str(proxy_info)[:50]  # Truncate long proxy strings
-                    if proxy_key not in proxy_usage:
-                        proxy_usage[proxy_key] = 0
-                    proxy_usage[proxy_key] += chunk_len
-                else:
-                    console.print(f"\n[ERROR] Failed to download chunk {chunk_id}: {proxy_info}", style="red")
-                    return False
-    
+            return [r for rs in group_results for r in rs]
+
+        try:
+            results = asyncio.run(run_downloads())
+        finally:
+            os.close(fd)
+
+        # Reap results (bytes are already on disk; workers return only
+        # counts). Account by the exact proxy URL the worker reported -
+        # truncation for display happens once at the printout
+        for chunk_id, success, chunk_len, proxy_info in results:
+            if success:
+                completed_chunks += 1
+                total_downloaded += chunk_len
+                proxy_usage[proxy_info] = proxy_usage.get(proxy_info, 0) + chunk_len
+            else:
+                console.print(f"\n[ERROR] Failed to download chunk {chunk_id}: {proxy_info}", style="red")
+                return False
+
     elapsed_time = time.time() - start_time
-    
+
     # Verify all chunks downloaded
-    if completed_chunks != num_threads:
-        print(f"\n[ERROR] Only downloaded {completed_chunks}/{num_threads} chunks")
+    if completed_chunks != len(chunks):
+        print(f"\n[ERROR] Only downloaded {completed_chunks}/{len(chunks)} chunks")
         return False
-    
-    # Combine chunks in order
-    print("\n[*] Combining chunks...")
-    combined_data = b''.join(downloaded_data)
-    
-    if len(combined_data) != file_size:
-        print(f"[WARNING] Downloaded {len(combined_data)} bytes, expected {file_size}")
-    
-    # Save file
-    output_path = Path(output_file)
-    with open(output_path, 'wb') as f:
-        f.write(combined_data)
-    
+
+    if total_downloaded != file_size:
+        print(f"[WARNING] Downloaded {total_downloaded} bytes, expected {file_size}")
+
     # Calculate stats
-    download_speed = len(combined_data) / elapsed_time / 1024 / 1024  # MB/s
+    download_speed = total_downloaded / elapsed_time / 1024 / 1024  # MB/s
     mbps = download_speed * 8  # Mbps
     
     print(f"\n{'='*60}")
@@ -242,12 +347,13 @@ def download_parallel(proxy, url, num_threads=4, output_file="test_parallel.mp4"
     print(f"Size: {file_size / 1024 / 1024:.2f} MB ({file_size:,} bytes)")
     print(f"Time: {elapsed_time:.2f} seconds")
     print(f"Speed: {download_speed:.2f} MB/s ({mbps:.2f} Mbps)")
-    print(f"Threads: {num_threads} parallel chunks")
-    print(f"Proxies used: {len(proxy_usage)}")
-    if proxy_usage:
+    print(f"Threads: {len(chunks)} ranges on {num_threads} workers")
+    used = {p: n for p, n in proxy_usage.items() if n}
+    print(f"Proxies used: {len(used)}")
+    if used:
         print(f"\nProxy usage distribution:")
-        for proxy, bytes_transferred in sorted(proxy_usage.items(), key=lambda x: x[1], reverse=True):
-            print(f"  {proxy[:60]}: {bytes_transferred / 1024 / 1024:.2f} MB ({bytes_transferred / elapsed_time / 1024 / 1024:.2f} MB/s)")
+        for proxy_name, bytes_transferred in sorted(used.items(), key=lambda x: x[1], reverse=True):
+            print(f"  {str(proxy_name)[:60]}: {bytes_transferred / 1024 / 1024:.2f} MB ({bytes_transferred / elapsed_time / 1024 / 1024:.2f} MB/s)")
     print(f"{'='*60}\n")
     
     return True
@@ -262,9 +368,8 @@ def download_single_stream(proxy, url, output_file="test_single.mp4"):
     start_time = time.time()
     
     try:
-        from i2ptunnel import I2PProxyDaemon
-        daemon = I2PProxyDaemon()
-        
+        daemon = _get_daemon()
+
         # Get file size first
         temp_response = proxy.get(url, stream=True)
         if temp_response.status_code != 200:
@@ -279,7 +384,7 @@ def download_single_stream(proxy, url, output_file="test_single.mp4"):
             method="GET",
             headers=None,
             body=None,
-            chunk_size=8192
+            chunk_size=STREAM_CHUNK_SIZE
         )
         
         if result["status"] != 200:
@@ -288,9 +393,11 @@ def download_single_stream(proxy, url, output_file="test_single.mp4"):
         
         output_path = Path(output_file)
         downloaded = 0
-        
+
         console = Console()
-        with open(output_path, 'wb') as f:
+        # 1 MiB write buffering batches the small FFI chunks into few
+        # syscalls
+        with open(output_path, 'wb', buffering=1 << 20) as f:
             with Progress(
                 SpinnerColumn(),
                 TextColumn("[progress.description]{task.description}"),
@@ -307,12 +414,19 @@ def download_single_stream(proxy, url, output_file="test_single.mp4"):
                     "[cyan]Downloading",
                     total=file_size,
                 )
+                pending = 0
                 for chunk in result["chunks"]:
                     if chunk:
-                        chunk_bytes = bytes(chunk)
-                        f.write(chunk_bytes)
-                        downloaded += len(chunk_bytes)
-                        progress.update(task, advance=len(chunk_bytes))
+                        # write() takes the FFI chunk directly - no
+                        # bytes() copy per 8 KiB
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        pending += len(chunk)
+                        if pending >= 1024 * 1024:
+                            progress.update(task, advance=pending)
+                            pending = 0
+                if pending:
+                    progress.update(task, advance=pending)
         
         elapsed_time = time.time() - start_time
         download_speed = downloaded / elapsed_time / 1024 / 1024
@@ -338,6 +452,9 @@ if __name__ == "__main__":
     num_threads = 4
     if len(sys.argv) > 2:
         num_threads = int(sys.argv[2])
+
+    if len(sys.argv) > 3:
+        STREAM_CHUNK_SIZE = int(sys.argv[3])
     
     print("I2P Proxy Parallel Download Speed Test")
     print("=" * 60)
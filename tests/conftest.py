@@ -2,13 +2,90 @@
 Pytest configuration file for i2ptunnel tests.
 This ensures that the i2p_proxy module can be imported.
 """
+import concurrent.futures
 import sys
 from pathlib import Path
 
+import pytest
+
 # Add the project root to Python path so i2p_proxy can be imported
 project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
+from i2ptunnel import I2PProxyDaemon  # noqa: E402
+from i2p_proxy import I2PProxy  # noqa: E402
+
+# Failures that mean "no router / no network", as opposed to a genuine
+# bug. The PyO3 binding surfaces transport errors as RuntimeError.
+NET_EXC = (ConnectionError, TimeoutError, OSError, RuntimeError)
+
+
+@pytest.fixture(scope="session")
+def daemon():
+    """One I2PProxyDaemon shared by the whole session.
+
+    Daemon construction initializes router state and is the dominant
+    per-test cost; tests that need an isolated instance construct
+    their own.
+    """
+    return I2PProxyDaemon()
+
+
+@pytest.fixture(scope="session")
+def proxy():
+    """One I2PProxy shared by the whole session.
+
+    Constructing the proxy spins up an I2PProxyDaemon, which is the
+    expensive part of every test; the instance is stateless from the
+    tests' point of view, so sharing it is safe.
+    """
+    return I2PProxy()
+
+
+@pytest.fixture(scope="session")
+def i2p_available(daemon):
+    """Whether an I2P router answers, probed once per session.
+
+    Every network-dependent test consults this instead of paying its own
+    connect timeout before reaching the same conclusion.
+    """
+    try:
+        daemon.fetch_proxies()
+    except NET_EXC:
+        return False
+    return True
+
+
+@pytest.fixture
+def require_i2p(i2p_available):
+    """Skip the requesting test immediately when no router is up."""
+    if not i2p_available:
+        pytest.skip("I2P router not available")
+
+
+@pytest.fixture(scope="session")
+def thread_pool():
+    """One ThreadPoolExecutor shared by the concurrency tests.
+
+    Reusing warm pool threads amortizes the OS thread-create cost that
+    per-test threading.Thread fan-outs paid on every run.
+    """
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+    yield pool
+    pool.shutdown(wait=True)
+
+
+@pytest.fixture(scope="session")
+def example_response(proxy, i2p_available):
+    """One GET of https://example.com reused by every test that only
+    inspects the response, instead of a network round trip per test."""
+    if not i2p_available:
+        pytest.skip("I2P router not available")
+    try:
+        return proxy.get("https://example.com")
+    except NET_EXC:
+        pytest.skip("request failed")
+
 
 